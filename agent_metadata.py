@@ -38,6 +38,12 @@ Should support `tool use` and `json schema mode`
 """
 
 
+# Utility classes and variable to switch LLM providers
+class ProviderKey(str, Enum):
+    OLLAMA = "ollama"
+    GROQ = "groq"
+
+
 class AgentsMetaData(BaseModel):
     """
     Agent metadata schema to store agent information.
@@ -51,12 +57,6 @@ class AgentsMetaData(BaseModel):
     model_config = {"arbitrary_types_allowed": True}
 
 
-# Utility classes and variable to switch LLM providers
-class ProviderKey(str, Enum):
-    OLLAMA = "ollama"
-    GROQ = "groq"
-
-
 CLIENTS = {
     ProviderKey.OLLAMA: AsyncOpenAI(api_key=ollama_api_key, base_url=ollama_base_url),
     ProviderKey.GROQ: AsyncOpenAI(api_key=groq_api_key, base_url=groq_base_url),
@@ -67,6 +67,14 @@ MODELS = {
     ProviderKey.GROQ: GROQ_MODEL,
 }
 
+"""
+Prompt/KV cache reuse needs no per-request hints: groq caches prompt prefixes
+automatically, and Ollama's OpenAI-compatible endpoint ignores `keep_alive` -
+keep the model (and its KV cache) loaded via OLLAMA_KEEP_ALIVE on the server
+instead (see README). Both only need the byte-stable prefix built by
+`request_builder`.
+"""
+
 
 def build_agent_metadata(
     base_name: str, instructions: str, provider: ProviderKey
@@ -102,16 +110,6 @@ keyword_generator_agent_metadata_groq = build_agent_metadata(
     ProviderKey.GROQ,
 )
 
-brave_web_search_agent_metadata_ollama = build_agent_metadata(
-    "Brave Web Search Agent",
-    system_prompts.brave_search_instructions,
-    ProviderKey.OLLAMA,
-)
-
-brave_web_search_agent_metadata_groq = build_agent_metadata(
-    "Brave Web Search Agent", system_prompts.brave_search_instructions, ProviderKey.GROQ
-)
-
 web_search_summariser_agent_metadata_ollama = build_agent_metadata(
     "Web Search Summariser Agent",
     system_prompts.summarise_search_result_instructions,
@@ -128,23 +126,34 @@ web_search_summariser_agent_metadata_groq = build_agent_metadata(
 if AGENT_PROVIDER == "ollama":
     router_agent_metadata = query_router_agent_metadata_ollama
     keyword_agent_metadata = keyword_generator_agent_metadata_ollama
-    brave_search_agent_metadata = brave_web_search_agent_metadata_ollama
     web_search_summariser_agent_metadata = web_search_summariser_agent_metadata_ollama
 elif AGENT_PROVIDER == "groq":
     router_agent_metadata = query_router_agent_metadata_groq
     keyword_agent_metadata = keyword_generator_agent_metadata_groq
-    brave_search_agent_metadata = brave_web_search_agent_metadata_groq
     web_search_summariser_agent_metadata = web_search_summariser_agent_metadata_groq
 elif AGENT_PROVIDER == "custom":
     router_agent_metadata = query_router_agent_metadata_ollama
     keyword_agent_metadata = keyword_generator_agent_metadata_ollama
-    brave_search_agent_metadata = brave_web_search_agent_metadata_groq
     web_search_summariser_agent_metadata = web_search_summariser_agent_metadata_groq
 else:
     print(f"Invalid AGENT_PROVIDER value: {AGENT_PROVIDER}")
     exit(1)
 
 
+_model_instances: dict[tuple[int, str], OpenAIChatCompletionsModel] = {}
+
+
+def get_model(metadata: AgentsMetaData) -> OpenAIChatCompletionsModel:
+    """Return the shared model instance for the metadata's client and model."""
+    key = (id(metadata.client), metadata.model)
+    if key not in _model_instances:
+        _model_instances[key] = OpenAIChatCompletionsModel(
+            model=metadata.model,
+            openai_client=metadata.client,
+        )
+    return _model_instances[key]
+
+
 def build_agent(
     metadata: AgentsMetaData,
     output_type: Optional[Any] = None,
@@ -156,12 +165,8 @@ def build_agent(
     kwargs = dict(
         name=metadata.name,
         instructions=metadata.instructions,
-        model=OpenAIChatCompletionsModel(
-            model=metadata.model,
-            openai_client=metadata.client,
-        ),
+        model=get_model(metadata),
     )
-
     # add optional output type and mcp servers to kwargs
     if output_type is not None:
         kwargs["output_type"] = output_type
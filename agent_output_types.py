@@ -15,6 +15,19 @@ class KeywordsOutput(BaseModel):
         ...,
         description="Identified web search phrase that can be used to do a web search to gather relevant information from the web.",
     )
+    search_queries: list[str] = Field(
+        default_factory=list,
+        description="Alternative, diverse variants of the search phrase (different wording, sources or sub-topics) that are searched concurrently to improve recall.",
+    )
+
+    def all_queries(self, max_queries: int = 4) -> list[str]:
+        """Primary search phrase followed by its unique variants, capped at `max_queries`."""
+        queries: list[str] = []
+        for q in [self.search_query, *self.search_queries]:
+            q = q.strip()
+            if q and q.lower() not in {x.lower() for x in queries}:
+                queries.append(q)
+        return queries[:max_queries]
 
 
 Intent = Literal[
@@ -2,7 +2,16 @@
 
 import os
 import io
-from contextlib import redirect_stdout
+import json
+import logging
+import sys
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 from agents import (
     Runner,
@@ -17,17 +26,32 @@ from agents.mcp import MCPServerStdio
 import agent_metadata
 import agent_output_types
 import brave_search
+import context_compression
+import deadlines
+import embeddings
+import request_builder
+import search_fusion
 
-from agents.model_settings import ModelSettings
 from agents.mcp.util import create_static_tool_filter
 
 
 load_dotenv(override=True)
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Load the rerank/compression embedding model at startup, not on the first
+# knowledge query inside its search stage budget
+embeddings.warm_up()
+
 # Must set this if want to use trace
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# Server-side log for process-wide statistics (all sessions), kept out of the
+# per-query thinking log shown to the user
+logger = logging.getLogger("crs_orchestrator")
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler(sys.__stderr__))
+    logger.setLevel(logging.INFO)
+
 
 # Defining some agents beforehand
 router_agent = agent_metadata.build_agent(
@@ -46,24 +70,6 @@ search_summariser_agent = agent_metadata.build_agent(
 )
 
 
-def format_history_for_context(
-    history: list[dict[str, str]], max_turns: int = 6
-) -> str:
-    """
-    Convert Streamlit-style history [{"role":"user"/"assistant","content":...}, ...]
-    into a compact text context. Trim to last `max_turns` pairs to avoid token bloat.
-    """
-    # keep only user/assistant messages
-    cleaned = [m for m in history if m.get("role") in ("user", "assistant")]
-    # take the last N*2 messages
-    trimmed = cleaned[-2 * max_turns :]
-    lines = []
-    for m in trimmed:
-        prefix = "User" if m["role"] == "user" else "Assistant"
-        lines.append(f"{prefix}: {m['content']}")
-    return "\n".join(lines)
-
-
 # Openai tracing
 DISABLE_TRACING = False
 set_tracing_disabled(DISABLE_TRACING)
@@ -71,94 +77,305 @@ set_tracing_disabled(DISABLE_TRACING)
 set_tracing_export_api_key(openai_api_key)
 
 
-async def process_query(query: str, history: list[dict[str, str]] | None = None):
-    # Build a combined input that includes prior conversation context
-    history_context = format_history_for_context(history or [], max_turns=6)
-    if history_context.strip():
-        router_input = (
-            "You are given prior conversation context. Use it only to stay consistent.\n\n"
-            "=== Conversation (most recent last) ===\n"
-            f"{history_context}\n"
-            "=== End conversation ===\n\n"
-            f"Final user message: {query}"
-        )
-    else:
-        router_input = query
+# Answers of recent knowledge queries, served as a fallback when a deadline runs out
+ANSWER_CACHE_SIZE = 128
+_answer_cache: OrderedDict[str, list[str]] = OrderedDict()
 
-    results_summaries: list[str] = []
+TIMEOUT_MESSAGE = (
+    "[Sorry, this request took too long to complete. Please try again "
+    "or rephrase the question...]"
+)
+
+
+def _cache_key(router_input: list[dict[str, str]]) -> str:
+    # keyed on the whole router input, so a short follow-up ("why?") only
+    # matches an earlier answer given in the same conversation context
+    return json.dumps(
+        [{**m, "content": " ".join(m["content"].lower().split())} for m in router_input]
+    )
+
+
+def _cache_answer(
+    router_input: list[dict[str, str]], results_summaries: list[str]
+) -> None:
+    key = _cache_key(router_input)
+    _answer_cache[key] = results_summaries
+    _answer_cache.move_to_end(key)
+    while len(_answer_cache) > ANSWER_CACHE_SIZE:
+        _answer_cache.popitem(last=False)
+
+
+# Log buffer of the query running in the current asyncio task / thread context.
+# Unlike `redirect_stdout`, this keeps logs of overlapping queries apart.
+_log_buffer: ContextVar[io.StringIO | None] = ContextVar("log_buffer", default=None)
 
-    # Prepare a buffer to capture prints
+
+class _ContextStdout:
+    """
+    sys.stdout proxy writing to the current query's log buffer, if any.
+
+    Every other attribute (`encoding`, `isatty()`, `fileno()`, `buffer`, ...)
+    is forwarded to the same target, so outside of a query it behaves exactly
+    like the original stdout and inside one like `redirect_stdout` would.
+    """
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    def _target(self):
+        return _log_buffer.get() or self._fallback
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._target(), name)
+
+
+@contextmanager
+def capture_logs():
+    """Capture everything printed by the current query into a string buffer."""
+    if not isinstance(sys.stdout, _ContextStdout):
+        sys.stdout = _ContextStdout(sys.stdout)
     buffer = io.StringIO()
-    # Redirect stdout to the buffer for capturing prints
-    with redirect_stdout(buffer):
-        # Agent pipeline logic
-        with trace("CRS Orchestrator Agent"):
-            router_result = await Runner.run(router_agent, input=router_input)
-            print(f"\nintent: {router_result.final_output.intent}")
-            print(f"explanation: {router_result.final_output.explanation}")
-            if router_result.final_output.intent == "knowledge_support":
-                keyword_result = await Runner.run(keyword_agent, input=query)
-                search_query = keyword_result.final_output.search_query
-                print("\nagent identified search phrase:\n", search_query)
-
-                # Use Brave search agent to get summaries with web search
-                async with MCPServerStdio(
-                    params=brave_search.mcp_params,
-                    client_session_timeout_seconds=30,
-                    tool_filter=create_static_tool_filter(
-                        allowed_tool_names=["brave_web_search"]  # show ONLY this tool
-                    ),
-                    cache_tools_list=True,
-                ) as mcp_server:
-                    brave_search_agent = agent_metadata.build_agent(
-                        metadata=agent_metadata.brave_search_agent_metadata,
-                        # output_type=agent_output_types.WebSearchResult,
-                        mcp_servers=[mcp_server],
-                        model_settings=ModelSettings(
-                            # tool_choice="required",  #"brave_web_search",  # force MCP tool to use - or use "required" - not working with groq
-                            parallel_tool_calls=False,  # optional: keep MCP call to one
-                            temperature=0.1,  # 0 -> eterministic output is forced
-                            max_tokens=512,
-                        ),
-                        tool_use_behavior="stop_on_first_tool",
-                    )
-                    raw_search_result = await Runner.run(
-                        brave_search_agent,
-                        brave_search.get_web_search_query(search_query),
-                    )
-
-                    search_summary = await Runner.run(
-                        search_summariser_agent,
-                        input=raw_search_result.final_output,
-                    )
-
-                    def model_to_dict(x):
-                        return x.model_dump() if hasattr(x, "model_dump") else dict(x)
-
-                    results_summaries = [
-                        brave_search.results_to_markdown(
-                            model_to_dict(search_summary.final_output)
-                        )
-                    ]
-                    # Should not remove this print line below as this is the identifier for thinkilng log end
-                    print("-THINKING ENDS-")
-            elif router_result.final_output.intent == "general":
-                # handling general queries for now and later will not be answered by the agent
-                results_summaries = [
-                    "[Note: General queries not related will not be answered from next version...] \n"
-                    + router_result.final_output.explanation
-                ]
-            else:
-                # For other intents, the explanation is the result
-                if router_result.final_output.explanation is None:
-                    results_summaries = [
-                        "[Workflows yet to be implemented. Please try other queries...]"
-                    ]
-                else:
-                    results_summaries = [router_result.final_output.explanation]
-            # --- End of agent pipeline logic ---
-    # Everythin within the `redirect_stdout` block, all printed text is in buffer
+    token = _log_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _log_buffer.reset(token)
+
+
+def _partial_answer(router_input: list[dict[str, str]], partial: dict) -> list[str]:
+    """Best available answer once the deadline of a query has run out."""
+    # this run's own search results first, they are known to match the query
+    if partial.get("top_results"):
+        return [
+            brave_search.results_to_markdown(
+                {
+                    "summary": "_[Timed out before the summary was ready. "
+                    "These are the most relevant search results found...]_",
+                    "references": partial["top_results"],
+                }
+            )
+        ]
+    cached = _answer_cache.get(_cache_key(router_input))
+    if cached:
+        return ["_[Timed out - showing an earlier answer...]_\n" + cached[0]]
+    router_output = partial.get("router_output")
+    if router_output is not None and router_output.explanation:
+        return [router_output.explanation]
+    return [TIMEOUT_MESSAGE]
+
+
+async def process_query(
+    query: str,
+    history: list[dict[str, str]] | None = None,
+    deadline: deadlines.Deadline | None = None,
+):
+    deadline = deadline or deadlines.Deadline()
+    # Prior conversation as chat messages with a byte-stable, cacheable prefix
+    router_input = request_builder.build_router_input(query, history)
+
+    results_summaries: list[str] = []
+    # Intermediate outputs, used for a graceful answer if the deadline runs out
+    partial: dict = {}
+    # Prompt cache usage of this query only
+    cache_stats = request_builder.PromptCacheStats()
+
+    # Capture prints of this query into its own buffer
+    with capture_logs() as buffer:
+        try:
+            # Agent pipeline logic
+            with trace("CRS Orchestrator Agent"):
+                results_summaries = await _run_pipeline(
+                    query, router_input, deadline, partial, cache_stats
+                )
+        except deadlines.DeadlineExceeded as e:
+            print(f"\ndeadline exceeded: {e}")
+            results_summaries = _partial_answer(router_input, partial)
+        deadlines.latency_stats.record("total", deadline.elapsed())
+        print(f"\nstage timings: {deadline.timings()}")
+        logger.info("latency stats:\n%s", deadlines.latency_stats.summary())
+        print(f"prompt cache usage:\n{cache_stats.summary()}")
+        request_builder.prompt_cache_stats.merge(cache_stats)
+        logger.info(
+            "prompt cache stats:\n%s", request_builder.prompt_cache_stats.summary()
+        )
+        # Should not remove this print line below as this is the identifier for thinkilng log end
+        print("-THINKING ENDS-")
+    # Everythin within the `capture_logs` block, all printed text is in buffer
     full_logs = buffer.getvalue()
     # Separate reasoning and result (if needed):
     # For example, everything up to "Search Summary:" is reasoning, and after that is final result.
     return full_logs, results_summaries
+
+
+async def _run_pipeline(
+    query: str,
+    router_input: list[dict[str, str]],
+    deadline: deadlines.Deadline,
+    partial: dict,
+    cache_stats: request_builder.PromptCacheStats,
+) -> list[str]:
+    async with deadline.stage("router"):
+        router_result = await Runner.run(router_agent, input=router_input)
+    cache_stats.record("router", router_result)
+    partial["router_output"] = router_result.final_output
+    print(f"\nintent: {router_result.final_output.intent}")
+    print(f"explanation: {router_result.final_output.explanation}")
+
+    if router_result.final_output.intent == "general":
+        # handling general queries for now and later will not be answered by the agent
+        return [
+            "[Note: General queries not related will not be answered from next version...] \n"
+            + router_result.final_output.explanation
+        ]
+    if router_result.final_output.intent != "knowledge_support":
+        # For other intents, the explanation is the result
+        if router_result.final_output.explanation is None:
+            return ["[Workflows yet to be implemented. Please try other queries...]"]
+        return [router_result.final_output.explanation]
+
+    async with deadline.stage("keywords"):
+        keyword_result = await Runner.run(keyword_agent, input=query)
+    cache_stats.record("keywords", keyword_result)
+    search_queries = keyword_result.final_output.all_queries(
+        max_queries=search_fusion.MAX_SEARCH_QUERIES
+    )
+    print("\nagent identified search phrases:")
+    for q in search_queries:
+        print(f" - {q}")
+
+    # Use the Brave search MCP server to get web search results
+    async with (
+        deadline.stage("search") as search_timeout,
+        MCPServerStdio(
+            params=brave_search.mcp_params,
+            client_session_timeout_seconds=min(30, search_timeout),
+            tool_filter=create_static_tool_filter(
+                allowed_tool_names=["brave_web_search"]  # show ONLY this tool
+            ),
+            cache_tools_list=True,
+        ) as mcp_server,
+    ):
+        # Search all query variants concurrently, spaced to the Brave rate limit
+        search_start = time.perf_counter()
+        search_results = await brave_search.web_search_many(
+            mcp_server, search_queries
+        )
+        result_lists = []
+        for q, r in zip(search_queries, search_results):
+            if isinstance(r, BaseException):
+                print(f"search failed for '{q}': {r}")
+                continue
+            result_lists.append(r)
+        print(
+            f"\n{len(result_lists)}/{len(search_queries)} searches succeeded in "
+            f"{time.perf_counter() - search_start:.2f}s (incl. "
+            f"{brave_search.stagger_seconds(len(search_queries)):.2f}s "
+            "rate-limit stagger)"
+        )
+        if not result_lists:
+            return [
+                brave_search.results_to_markdown(
+                    {"summary": "No reliable web information found.", "references": []}
+                )
+            ]
+
+        # Fuse, dedupe and rerank locally - only top-k go to the summariser
+        fused_results = search_fusion.reciprocal_rank_fusion(result_lists)
+        top_results = await asyncio.to_thread(
+            search_fusion.rerank, query, fused_results
+        )
+        partial["top_results"] = top_results
+        print(
+            f"fused {sum(len(x) for x in result_lists)} results into "
+            f"{len(fused_results)} unique, kept top {len(top_results)}"
+        )
+        # Compress to the most relevant, non-redundant sentences
+        compressed_results, compression_stats = await asyncio.to_thread(
+            context_compression.compress_context,
+            query,
+            top_results,
+            seconds_per_token=deadlines.summariser_seconds_per_token.value,
+        )
+        print(compression_stats)
+        summariser_input = search_fusion.results_to_text(compressed_results)
+
+    summariser_start = time.perf_counter()
+    async with deadline.stage("summariser"):
+        search_summary = await Runner.run(
+            search_summariser_agent,
+            input=summariser_input,
+        )
+    summariser_seconds = time.perf_counter() - summariser_start
+    summariser_input_tokens = search_summary.context_wrapper.usage.input_tokens
+    deadlines.summariser_seconds_per_token.update(
+        summariser_seconds, summariser_input_tokens
+    )
+    print(
+        f"\nsummariser took {summariser_seconds:.2f}s for "
+        f"{summariser_input_tokens} input tokens"
+    )
+    cache_stats.record("summariser", search_summary)
+
+    def model_to_dict(x):
+        return x.model_dump() if hasattr(x, "model_dump") else dict(x)
+
+    results_summaries = [
+        brave_search.results_to_markdown(model_to_dict(search_summary.final_output))
+    ]
+    _cache_answer(router_input, results_summaries)
+    return results_summaries
+
+
+# Background event loop shared by all Streamlit sessions. A persistent loop lets
+# a new query cancel the in-flight query of the same session from another thread.
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_session_queries: dict[str, Future] = {}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="agents-runner-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def submit_query(
+    session_id: str,
+    query: str,
+    history: list[dict[str, str]] | None = None,
+    budget_seconds: float = deadlines.QUERY_DEADLINE_SECONDS,
+) -> Future:
+    """
+    Run `process_query` on the background loop and return its future.
+
+    Any query of the same session that is still running is cancelled first,
+    including its in-flight LLM and tool calls, since its answer is superseded.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        process_query(query, history, deadlines.Deadline(budget_seconds)),
+        _get_loop(),
+    )
+    with _loop_lock:
+        previous = _session_queries.get(session_id)
+        _session_queries[session_id] = future
+    if previous is not None and previous.cancel():
+        logger.info("cancelled superseded query of session %s", session_id)
+
+    def forget(f: Future) -> None:
+        with _loop_lock:
+            if _session_queries.get(session_id) is f:
+                del _session_queries[session_id]
+
+    future.add_done_callback(forget)
+    return future
@@ -1,8 +1,9 @@
 """Minimal Streamlit UI for chatbot app to interact with the agents."""
 
 import streamlit as st
-import asyncio
-from agents_runner import process_query
+import time
+import uuid
+from agents_runner import submit_query
 
 # --- Sidebar ---
 with st.sidebar:
@@ -41,6 +42,9 @@ st.title("AI Assistant for CRS Orchestration")
 # Initialize chat history in session state
 if "messages" not in st.session_state:
     st.session_state.messages = []  # list of {"role": ..., "content": ...}
+# Identifies the browser session, used to cancel its superseded queries
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 
 # Display existing conversation from history on each run
 for msg in st.session_state.messages:
@@ -56,10 +60,25 @@ if user_query := st.chat_input("How can I help you?..."):
     st.session_state.messages.append({"role": "user", "content": user_query})
 
     # 2. Process the query through the agent pipeline - with history included
-    # (Calling the async function via asyncio.run, since Streamlit expects sync code)
-    thinking_log, results = asyncio.run(
-        process_query(user_query, history=st.session_state.messages)
+    # (The pipeline runs on a background event loop, a newer query of this
+    # session cancels it)
+    future = submit_query(
+        st.session_state.session_id, user_query, history=st.session_state.messages
     )
+    status = st.empty()
+    started = time.monotonic()
+    try:
+        # Poll instead of blocking, so that Streamlit can interrupt this run
+        # when the user sends a new message
+        while not future.done():
+            status.caption(f"Working on it... {time.monotonic() - started:.0f}s")
+            time.sleep(0.25)
+    finally:
+        # run stopped or rerun by Streamlit - nobody waits for this answer anymore
+        if not future.done():
+            future.cancel()
+    status.empty()
+    thinking_log, results = future.result()
 
     # 3. Format the assistant's response with separate Thinking and Result sections
     # `thinking_log` is a large string of all prints
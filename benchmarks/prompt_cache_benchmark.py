@@ -0,0 +1,176 @@
+"""Mock-server benchmark of provider prompt-prefix cache hits for the router input.
+
+Runs the query router agent against a local mock of an OpenAI-compatible
+chat completions endpoint over a synthetic multi-turn conversation, once with
+the legacy text-wrapped history layout and once with
+`request_builder.build_router_input`. The mock emulates provider prefix
+caching: a request's cached tokens are the longest prefix it shares with any
+earlier request, reported back in `usage.prompt_tokens_details.cached_tokens`.
+
+Usage::
+
+    uv run python benchmarks/prompt_cache_benchmark.py --turns 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import AsyncOpenAI, Runner, set_tracing_disabled  # noqa: E402
+
+import agent_metadata  # noqa: E402
+import agent_output_types  # noqa: E402
+import request_builder  # noqa: E402
+import system_prompts  # noqa: E402
+
+# Same rough estimate as context_compression: ~4 characters per token
+CHARS_PER_TOKEN = 4
+
+
+class _PrefixCache:
+    """Remembers every prompt seen and reports the longest shared prefix."""
+
+    def __init__(self):
+        self._prompts: list[str] = []
+        self._lock = threading.Lock()
+
+    def lookup_and_store(self, prompt: str) -> int:
+        with self._lock:
+            best = max(
+                (_common_prefix_len(prompt, p) for p in self._prompts), default=0
+            )
+            self._prompts.append(prompt)
+        return best
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _make_handler(cache: _PrefixCache):
+    class MockChatCompletions(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            # providers cache on the serialised prompt, i.e. messages in order
+            prompt = "".join(
+                json.dumps(m, sort_keys=True, ensure_ascii=False)
+                for m in body["messages"]
+            )
+            prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+            cached_tokens = cache.lookup_and_store(prompt) // CHARS_PER_TOKEN
+            content = json.dumps({"intent": "general", "explanation": "Mock answer."})
+            payload = json.dumps(
+                {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(content) // CHARS_PER_TOKEN,
+                        "total_tokens": prompt_tokens
+                        + len(content) // CHARS_PER_TOKEN,
+                        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                    },
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return MockChatCompletions
+
+
+def legacy_router_input(query: str, history: list[dict[str, str]]) -> str:
+    """Router input layout before `request_builder` - text-wrapped history."""
+    cleaned = [m for m in history if m.get("role") in ("user", "assistant")]
+    trimmed = cleaned[-12:]
+    history_context = "\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+        for m in trimmed
+    )
+    if not history_context.strip():
+        return query
+    return (
+        "You are given prior conversation context. Use it only to stay consistent.\n\n"
+        "=== Conversation (most recent last) ===\n"
+        f"{history_context}\n"
+        "=== End conversation ===\n\n"
+        f"Final user message: {query}"
+    )
+
+
+async def run_conversation(base_url: str, layout: str, turns: int) -> float:
+    """Run `turns` router calls against a fresh mock cache, return cached ratio."""
+    metadata = agent_metadata.AgentsMetaData(
+        name=f"Query Router Agent {layout}",
+        instructions=system_prompts.query_router_instructions,
+        model="mock-model",
+        client=AsyncOpenAI(api_key="mock", base_url=base_url),
+    )
+    router_agent = agent_metadata.build_agent(
+        metadata=metadata, output_type=agent_output_types.ClassificationOutput
+    )
+    stats = request_builder.PromptCacheStats()
+    history: list[dict[str, str]] = []
+    for turn in range(turns):
+        query = f"Question {turn}: how does 5G network slicing isolation work?"
+        history.append({"role": "user", "content": query})
+        if layout == "legacy":
+            router_input = legacy_router_input(query, history)
+        else:
+            router_input = request_builder.build_router_input(query, history)
+        result = await Runner.run(router_agent, input=router_input)
+        stats.record("router", result)
+        history.append(
+            {
+                "role": "assistant",
+                "content": f"**Response:**\n\nAnswer {turn} about network slicing.",
+            }
+        )
+    return stats.cached_ratio("router")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    set_tracing_disabled(True)
+    for layout in ("legacy", "request_builder"):
+        # a fresh server per layout, so the layouts do not share cache entries
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(_PrefixCache()))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}/v1"
+        try:
+            ratio = asyncio.run(run_conversation(base_url, layout, args.turns))
+        finally:
+            server.shutdown()
+        print(f"{layout:<16} cached prompt tokens: {ratio:.0%} over {args.turns} turns")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 """Utility functions for brave web search."""
 
 import os
+import asyncio
+import re
 from dotenv import load_dotenv
 
-from typing import Mapping
+from typing import Any, Mapping
 from urllib.parse import urlsplit, urlunsplit, urlencode, parse_qsl
 
 load_dotenv(override=True)
@@ -17,30 +19,144 @@ mcp_params = {
 }
 
 
-def get_web_search_query(search_query: str) -> str:
+# The Brave MCP server (and the free Brave plan) allow 1 request per second,
+# concurrent searches are spaced by this interval to stay under the limit
+BRAVE_MIN_INTERVAL_SECONDS = 1.05
+# Results requested per search query (the tool allows 1-20)
+BRAVE_RESULT_COUNT = 10
+
+
+class BraveSearchError(RuntimeError):
+    """Raised when a Brave web search returns an error or no usable results."""
+
+
+async def web_search(
+    mcp_server: Any, search_query: str, count: int = BRAVE_RESULT_COUNT
+) -> list[dict[str, str]]:
     """
-    Build a strict prompt instructing the agent to perform a public web search
-    (not internal memory) using the given search phrase.
+    Call the `brave_web_search` MCP tool directly and parse its results.
 
     Parameters
     ----------
+    mcp_server : MCPServer
+        Connected Brave search MCP server.
     search_query : str
         The search phrase to query on the web.
+    count : int
+        Number of results to request.
+
+    Returns
+    -------
+    list[dict[str, str]]
+        Parsed results, see `parse_search_results`.
+
+    Raises
+    ------
+    BraveSearchError
+        If the tool reports an error (e.g. "Rate limit exceeded") or its
+        output contains no parseable result.
+    """
+    result = await mcp_server.call_tool(
+        "brave_web_search", {"query": search_query, "count": count}
+    )
+    text = "\n\n".join(
+        str(getattr(c, "text", "")) for c in result.content if c.type == "text"
+    )
+    if result.isError:
+        raise BraveSearchError(text.strip() or "brave_web_search failed")
+    results = parse_search_results(text)
+    if not results:
+        raise BraveSearchError(f"no results parsed from: {text.strip()[:200]!r}")
+    return results
+
+
+async def web_search_many(
+    mcp_server: Any,
+    search_queries: list[str],
+    min_interval: float = BRAVE_MIN_INTERVAL_SECONDS,
+) -> list[list[dict[str, str]] | BaseException]:
+    """
+    Run several searches concurrently, starting them `min_interval` apart.
+
+    The last search starts `(len(search_queries) - 1) * min_interval` seconds
+    after the first, see `stagger_seconds`.
+
+    Returns one entry per query, in order: the parsed results, or the
+    exception the search failed with.
+    """
+
+    async def delayed_search(i: int, search_query: str) -> list[dict[str, str]]:
+        await asyncio.sleep(stagger_seconds(i + 1, min_interval))
+        return await web_search(mcp_server, search_query)
+
+    return await asyncio.gather(
+        *(delayed_search(i, q) for i, q in enumerate(search_queries)),
+        return_exceptions=True,
+    )
+
+
+def stagger_seconds(
+    n_queries: int, min_interval: float = BRAVE_MIN_INTERVAL_SECONDS
+) -> float:
+    """Delay before the last of `n_queries` rate-limited searches starts."""
+    return max(n_queries - 1, 0) * min_interval
+
+
+_RESULT_FIELD_RE = re.compile(r"^(Title|Description|URL):\s*(.*)$")
+
+
+def parse_search_results(raw: str) -> list[dict[str, str]]:
+    """
+    Parse the Brave MCP `brave_web_search` output into a ranked list of results.
+
+    The tool returns blocks of the form::
+
+        Title: ...
+        Description: ...
+        URL: ...
+
+    separated by blank lines. Blocks without a URL are skipped.
+
+    Parameters
+    ----------
+    raw : str
+        Text content of a `brave_web_search` tool result.
 
     Returns
     -------
-    str
-        A formatted prompt ready to be sent to the agent.
+    list[dict[str, str]]
+        Results in the order returned by the search engine, each with
+        `title`, `description` and `url` keys.
     """
-    return f"""TASK: Use the public web (not memory) to search for:
-            {search_query}
-
-            REQUIREMENTS:
-            - Return relevant results only.
-            - Each result must include: title, snippet, and canonical URL.
-            - Provide up to 5 high-quality results, ordered by usefulness.
-            - Do not answer the query yourself, only return search results.
-            """
+    results: list[dict[str, str]] = []
+    current: dict[str, str] = {}
+
+    def flush() -> None:
+        if current.get("url"):
+            results.append(
+                {
+                    "title": current.get("title", ""),
+                    "description": current.get("description", ""),
+                    "url": current["url"],
+                }
+            )
+        current.clear()
+
+    for line in str(raw or "").splitlines():
+        line = line.strip()
+        match = _RESULT_FIELD_RE.match(line)
+        if match:
+            key = match.group(1).lower()
+            if key in current:  # a new block started without a blank line
+                flush()
+            current[key] = match.group(2).strip()
+        elif not line:
+            flush()
+        elif "description" in current and "url" not in current:
+            # multi-line description
+            current["description"] += " " + line
+    flush()
+    return results
 
 
 def _md_escape(text: str) -> str:
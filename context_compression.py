@@ -0,0 +1,257 @@
+"""Local compression of web search results before they reach the summariser."""
+
+import html
+import re
+import time
+from typing import Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+import embeddings
+from search_fusion import results_to_text
+
+# Approximate prompt budget for the search results passed to the summariser
+CONTEXT_TOKEN_BUDGET = 400
+# Sentences more similar than this to an already selected one are dropped
+NEAR_DUPLICATE_THRESHOLD = 0.9
+# MMR trade-off: 1.0 -> pure relevance, 0.0 -> pure diversity
+MMR_LAMBDA = 0.7
+# Shorter fragments are mostly boilerplate ("Read more", dates, breadcrumbs)
+MIN_SENTENCE_CHARS = 25
+# Nominal prompt-processing speed, used for the latency-saved figure only
+# until a measured summariser rate is available
+NOMINAL_PREFILL_TOKENS_PER_SECOND = 500
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class CompressionStats(BaseModel):
+    """
+    Report of a single context compression run.
+    """
+
+    original_tokens: int
+    compressed_tokens: int
+    sentences_in: int
+    sentences_kept: int
+    duplicates_dropped: int
+    compression_seconds: float
+    latency_saved_seconds: float
+    seconds_per_token: float
+    # True if `seconds_per_token` is measured, False if it is the nominal rate
+    rate_measured: bool
+    # False if nothing could be selected and the input is passed on unchanged
+    applied: bool = True
+
+    @property
+    def token_reduction(self) -> float:
+        if not self.original_tokens:
+            return 0.0
+        return 1 - self.compressed_tokens / self.original_tokens
+
+    def __str__(self) -> str:
+        if not self.applied:
+            return (
+                f"context compression: skipped, no sentence fits the budget - "
+                f"passing {self.original_tokens} tokens unchanged "
+                f"(took {self.compression_seconds:.2f}s)"
+            )
+        return (
+            f"context compression: {self.original_tokens} -> "
+            f"{self.compressed_tokens} tokens (-{self.token_reduction:.0%}), "
+            f"kept {self.sentences_kept}/{self.sentences_in} sentences, "
+            f"{self.duplicates_dropped} near-duplicates dropped, "
+            f"took {self.compression_seconds:.2f}s, summariser latency saved "
+            f"{self.latency_saved_seconds:.2f}s (at "
+            f"{self.seconds_per_token * 1000:.2f}ms/token, "
+            f"{'measured' if self.rate_measured else 'nominal'})"
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap provider-agnostic token estimate (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _clean(text: str) -> str:
+    # Brave snippets carry html highlighting (<strong>) and entities
+    text = html.unescape(_HTML_TAG_RE.sub("", text))
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split `text` into cleaned sentences, dropping boilerplate fragments."""
+    return [
+        s
+        for s in _SENTENCE_SPLIT_RE.split(_clean(text))
+        if len(s) >= MIN_SENTENCE_CHARS
+    ]
+
+
+def _mmr_select(
+    relevance: np.ndarray,
+    similarity: np.ndarray,
+    costs: Sequence[int],
+    groups: Sequence[int],
+    group_costs: Sequence[int],
+    budget: int,
+    mmr_lambda: float,
+    duplicate_threshold: float,
+) -> tuple[list[int], int]:
+    """
+    Greedy MMR selection under a token budget, skipping near-duplicates.
+
+    Candidate `i` belongs to group `groups[i]` (its search result); the
+    group's fixed cost (title/URL) is charged when its first candidate is
+    picked, so results that end up dropped do not use up the budget.
+    """
+    n = len(relevance)
+    selected: list[int] = []
+    charged_groups: set[int] = set()
+    available = np.ones(n, dtype=bool)
+    # highest similarity of every candidate to anything selected so far
+    max_sim = np.zeros(n, dtype=np.float32)
+    used = 0
+    duplicates = 0
+    while available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_sim
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        if selected and max_sim[best] >= duplicate_threshold:
+            duplicates += 1
+            continue
+        cost = costs[best]
+        if groups[best] not in charged_groups:
+            cost += group_costs[groups[best]]
+        if used + cost > budget:
+            # may still fit a shorter sentence
+            continue
+        selected.append(best)
+        charged_groups.add(groups[best])
+        used += cost
+        max_sim = np.maximum(max_sim, similarity[best])
+    return selected, duplicates
+
+
+def compress_context(
+    query: str,
+    results: Sequence[dict],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    mmr_lambda: float = MMR_LAMBDA,
+    duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    seconds_per_token: float | None = None,
+) -> tuple[list[dict], CompressionStats]:
+    """
+    Keep only the most query-relevant, non-redundant sentences of `results`.
+
+    Descriptions are split into sentences, exact repeats are removed and the
+    rest is embedded in batches together with the query. Sentences are then
+    picked with maximal marginal relevance until `token_budget` is spent;
+    sentences above `duplicate_threshold` cosine similarity to a picked one
+    are dropped as near-duplicates. Titles and URLs of the surviving results
+    are kept as-is so that the summariser can still cite them.
+
+    Parameters
+    ----------
+    query : str
+        The original user question.
+    results : Sequence[dict]
+        Search results with `title`, `description` and `url` keys.
+    token_budget : int
+        Approximate token budget for the compressed results.
+    mmr_lambda : float
+        Relevance vs diversity trade-off for MMR.
+    duplicate_threshold : float
+        Cosine similarity above which a sentence counts as a near-duplicate.
+    seconds_per_token : float | None
+        Measured summariser latency per input token, used for the latency
+        saved. The nominal rate is used if None.
+
+    Returns
+    -------
+    tuple[list[dict], CompressionStats]
+        Results (original order) whose description holds only the selected
+        sentences - results without any selected sentence are dropped - and
+        the compression report. If no sentence can be selected (all snippets
+        too short, or no title/URL plus sentence fits the budget) `results` is
+        returned unchanged and the report says so.
+    """
+    start = time.perf_counter()
+    original_tokens = estimate_tokens(results_to_text(results))
+
+    # (result index, sentence) passages with exact repeats removed
+    passages: list[tuple[int, str]] = []
+    seen: set[str] = set()
+    sentences_in = 0
+    for i, r in enumerate(results):
+        for sentence in split_sentences(str(r.get("description", ""))):
+            sentences_in += 1
+            key = sentence.lower()
+            if key not in seen:
+                seen.add(key)
+                passages.append((i, sentence))
+    duplicates = sentences_in - len(passages)
+
+    selected: list[int] = []
+    if passages:
+        # title/url cost of each result, charged only if the result is kept
+        # (+1 for the blank line between results)
+        overheads = [
+            estimate_tokens(results_to_text([{**r, "description": ""}])) + 1
+            for r in results
+        ]
+        vectors = embeddings.embed([query, *(s for _, s in passages)])
+        relevance = vectors[1:] @ vectors[0]
+        similarity = vectors[1:] @ vectors[1:].T
+        selected, near_duplicates = _mmr_select(
+            relevance,
+            similarity,
+            [estimate_tokens(s) + 1 for _, s in passages],
+            [i for i, _ in passages],
+            overheads,
+            token_budget,
+            mmr_lambda,
+            duplicate_threshold,
+        )
+        duplicates += near_duplicates
+
+    kept: dict[int, list[str]] = {}
+    for p in sorted(selected):  # restore reading order
+        i, sentence = passages[p]
+        kept.setdefault(i, []).append(sentence)
+    compressed = [
+        {
+            **results[i],
+            "title": _clean(str(results[i].get("title", ""))),
+            "description": " ".join(sentences),
+        }
+        for i, sentences in sorted(kept.items())
+    ]
+    applied = bool(compressed)
+    if not applied:
+        compressed = list(results)
+
+    compressed_tokens = estimate_tokens(results_to_text(compressed))
+    rate_measured = seconds_per_token is not None
+    if not rate_measured:
+        seconds_per_token = 1 / NOMINAL_PREFILL_TOKENS_PER_SECOND
+    elapsed = time.perf_counter() - start
+    stats = CompressionStats(
+        original_tokens=original_tokens,
+        compressed_tokens=compressed_tokens,
+        sentences_in=sentences_in,
+        sentences_kept=len(selected),
+        duplicates_dropped=duplicates,
+        compression_seconds=elapsed,
+        latency_saved_seconds=(original_tokens - compressed_tokens)
+        * seconds_per_token
+        - elapsed,
+        seconds_per_token=seconds_per_token,
+        rate_measured=rate_measured,
+        applied=applied,
+    )
+    return compressed, stats
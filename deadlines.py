@@ -0,0 +1,168 @@
+"""End-to-end deadlines, per-stage timeouts and latency statistics for the pipeline."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+# Overall wall-clock budget for a single user query
+QUERY_DEADLINE_SECONDS = 90.0
+
+# Pipeline stages in execution order with their share of the budget.
+# Time left over by a fast stage rolls forward to the following ones.
+STAGE_BUDGET_SHARES = {
+    "router": 0.15,
+    "keywords": 0.10,
+    "search": 0.45,
+    "summariser": 0.30,
+}
+
+# Number of recent samples kept per stage for the tail-latency statistics
+LATENCY_WINDOW = 500
+# Weight of the newest measurement in the moving-average latency rates
+RATE_EWMA_ALPHA = 0.2
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a pipeline stage runs out of its time budget."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"stage '{stage}' exceeded its {timeout:.1f}s budget")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class LatencyRecorder:
+    """
+    Rolling per-stage latency samples with tail percentiles.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: dict[str, deque[float]] = {}
+        self._timeouts: dict[str, int] = {}
+        self._window = window
+
+    def record(self, stage: str, seconds: float, timed_out: bool = False) -> None:
+        self._samples.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+        if timed_out:
+            self._timeouts[stage] = self._timeouts.get(stage, 0) + 1
+
+    def percentiles(self, stage: str) -> dict[str, float]:
+        """p50/p95/p99 and max latency in seconds for `stage`."""
+        samples = np.fromiter(self._samples.get(stage, ()), dtype=float)
+        if not samples.size:
+            return {}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {"p50": p50, "p95": p95, "p99": p99, "max": samples.max()}
+
+    def summary(self) -> str:
+        """One line per stage, e.g. `router n=12 p50=0.81s p95=1.90s ...`."""
+        lines = []
+        for stage, samples in self._samples.items():
+            stats = " ".join(
+                f"{k}={v:.2f}s" for k, v in self.percentiles(stage).items()
+            )
+            lines.append(
+                f"{stage:<11} n={len(samples)} {stats} "
+                f"timeouts={self._timeouts.get(stage, 0)}"
+            )
+        return "\n".join(lines)
+
+
+# Process-wide statistics shared by all sessions
+latency_stats = LatencyRecorder()
+
+
+class EwmaRate:
+    """
+    Exponentially weighted moving average of a seconds-per-unit rate.
+    """
+
+    def __init__(self, alpha: float = RATE_EWMA_ALPHA):
+        self.alpha = alpha
+        self.value: float | None = None  # None until the first measurement
+
+    def update(self, seconds: float, units: int) -> None:
+        if units <= 0:
+            return
+        rate = seconds / units
+        if self.value is None:
+            self.value = rate
+        else:
+            self.value = self.alpha * rate + (1 - self.alpha) * self.value
+
+
+# Measured summariser latency per input token, process-wide. It attributes the
+# whole call (including generation) to the input, so savings based on it are
+# an upper bound.
+summariser_seconds_per_token = EwmaRate()
+
+
+class Deadline:
+    """
+    Wall-clock budget for one query, split into per-stage timeouts.
+
+    Usage::
+
+        deadline = Deadline()
+        async with deadline.stage("router"):
+            result = await Runner.run(...)
+
+    Leaving the budget of a stage cancels everything awaited inside it
+    (in-flight LLM requests, MCP tool calls) and raises `DeadlineExceeded`.
+    """
+
+    def __init__(
+        self,
+        budget_seconds: float = QUERY_DEADLINE_SECONDS,
+        stage_shares: dict[str, float] | None = None,
+        recorder: LatencyRecorder = latency_stats,
+    ):
+        self.budget_seconds = budget_seconds
+        self.stage_shares = dict(stage_shares or STAGE_BUDGET_SHARES)
+        self.recorder = recorder
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds
+        # stage -> seconds spent, for this query only
+        self.stage_seconds: dict[str, float] = {}
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def timings(self) -> str:
+        """This query's stage timings, e.g. `router 0.81s, keywords 0.40s, ...`."""
+        stages = [f"{s} {t:.2f}s" for s, t in self.stage_seconds.items()]
+        return ", ".join(stages + [f"total {self.elapsed():.2f}s"])
+
+    def stage_timeout(self, stage: str) -> float:
+        """Share of the remaining budget for `stage` and the stages after it."""
+        stages = list(self.stage_shares)
+        if stage not in self.stage_shares:
+            return self.remaining()
+        pending = sum(self.stage_shares[s] for s in stages[stages.index(stage) :])
+        return self.remaining() * self.stage_shares[stage] / pending
+
+    @asynccontextmanager
+    async def stage(self, stage: str):
+        timeout = self.stage_timeout(stage)
+        start = time.monotonic()
+        stage_timer = asyncio.timeout(timeout)
+        try:
+            async with stage_timer:
+                yield timeout
+        except TimeoutError as e:
+            if not stage_timer.expired():
+                raise  # a timeout from inside the stage, not our budget
+            self._record(stage, time.monotonic() - start, timed_out=True)
+            raise DeadlineExceeded(stage, timeout) from e
+        # cancelled (superseded) stages are not recorded
+        self._record(stage, time.monotonic() - start)
+
+    def _record(self, stage: str, seconds: float, timed_out: bool = False) -> None:
+        self.stage_seconds[stage] = seconds
+        self.recorder.record(stage, seconds, timed_out)
@@ -0,0 +1,63 @@
+"""Local sentence-transformers embeddings shared by the retrieval utilities."""
+
+import threading
+from typing import Sequence
+
+import numpy as np
+
+# Small, fast CPU model - good enough for reranking short web snippets
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the sentence-transformers model once per process."""
+    global _model
+    # the lock makes a query arriving during `warm_up` wait for that load
+    # instead of loading (or downloading) the model a second time
+    with _model_lock:
+        if _model is None:
+            # imported lazily so that importing this module stays cheap
+            from sentence_transformers import SentenceTransformer
+
+            _model = SentenceTransformer(EMBEDDING_MODEL)
+        return _model
+
+
+def warm_up() -> None:
+    """Load (and if needed download) the model in a background thread."""
+    threading.Thread(
+        target=get_embedding_model, name="embedding-warm-up", daemon=True
+    ).start()
+
+
+def embed(texts: Sequence[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """
+    Embed `texts` in batches into L2-normalised vectors.
+
+    Parameters
+    ----------
+    texts : Sequence[str]
+        Texts to embed.
+    batch_size : int
+        Number of texts encoded per forward pass.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (len(texts), dim), dtype float32. Since rows are unit
+        vectors, cosine similarity is a plain dot product.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    vectors = get_embedding_model().encode(
+        list(texts),
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
@@ -0,0 +1,108 @@
+"""Builds prefix-cache friendly agent inputs and tracks cached prompt tokens.
+
+Providers (Groq, OpenAI) and Ollama only reuse a cached prompt prefix / KV
+cache if the request starts with exactly the same bytes as an earlier one.
+Requests are therefore laid out as: system prompt (the agent instructions),
+frozen older history, then the new turns, with the final user message last.
+"""
+
+from typing import Any
+
+# Max number of prior messages (user + assistant) sent as context
+MAX_HISTORY_MESSAGES = 12
+# Old history is dropped in whole blocks of this many messages, so the kept
+# prefix stays byte-identical between drops instead of shifting every turn
+HISTORY_BLOCK_MESSAGES = 6
+
+
+def frozen_history(
+    history: list[dict[str, str]],
+    max_messages: int = MAX_HISTORY_MESSAGES,
+    block: int = HISTORY_BLOCK_MESSAGES,
+) -> list[dict[str, str]]:
+    """
+    Trim `history` to at most `max_messages`, dropping the oldest in blocks.
+
+    A plain sliding window of the last N messages changes the first message
+    on every turn and invalidates the whole cached prefix. Dropping whole
+    blocks keeps the start of the window fixed for `block` messages.
+    """
+    overflow = len(history) - max_messages
+    if overflow <= 0:
+        return list(history)
+    start = -(-overflow // block) * block  # round up to a block boundary
+    return history[start:]
+
+
+def build_router_input(
+    query: str, history: list[dict[str, str]] | None = None
+) -> list[dict[str, str]]:
+    """
+    Build the router input as chat messages with a byte-stable prefix.
+
+    Parameters
+    ----------
+    query : str
+        The final user message.
+    history : list[dict[str, str]] | None
+        Streamlit-style history [{"role": "user"/"assistant", "content": ...}].
+        A trailing copy of `query` (the app appends it before calling) is
+        ignored.
+
+    Returns
+    -------
+    list[dict[str, str]]
+        Input items for `Runner.run`, the final user message last.
+    """
+    # keep only user/assistant messages, with exactly the keys the model sees
+    cleaned = [
+        {"role": m["role"], "content": m["content"]}
+        for m in history or []
+        if m.get("role") in ("user", "assistant")
+    ]
+    if cleaned and cleaned[-1] == {"role": "user", "content": query}:
+        cleaned.pop()
+    return frozen_history(cleaned) + [{"role": "user", "content": query}]
+
+
+class PromptCacheStats:
+    """
+    Cumulative input and provider-cached prompt tokens per agent.
+    """
+
+    def __init__(self):
+        self._input_tokens: dict[str, int] = {}
+        self._cached_tokens: dict[str, int] = {}
+
+    def record(self, name: str, result: Any) -> None:
+        """Add the token usage of a `RunResult` under `name`."""
+        usage = result.context_wrapper.usage
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        self._input_tokens[name] = self._input_tokens.get(name, 0) + usage.input_tokens
+        self._cached_tokens[name] = self._cached_tokens.get(name, 0) + cached
+
+    def merge(self, other: "PromptCacheStats") -> None:
+        """Add the totals of `other`, e.g. a single query's stats."""
+        for name, tokens in other._input_tokens.items():
+            self._input_tokens[name] = self._input_tokens.get(name, 0) + tokens
+            self._cached_tokens[name] = (
+                self._cached_tokens.get(name, 0) + other._cached_tokens[name]
+            )
+
+    def cached_ratio(self, name: str) -> float:
+        if not self._input_tokens.get(name):
+            return 0.0
+        return self._cached_tokens[name] / self._input_tokens[name]
+
+    def summary(self) -> str:
+        """One line per agent, e.g. `router input=5120 cached=3840 (75%)`."""
+        return "\n".join(
+            f"{name:<11} input={tokens} cached={self._cached_tokens[name]} "
+            f"({self.cached_ratio(name):.0%})"
+            for name, tokens in self._input_tokens.items()
+        )
+
+
+# Process-wide statistics shared by all sessions (queries merge into it)
+prompt_cache_stats = PromptCacheStats()
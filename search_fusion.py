@@ -0,0 +1,126 @@
+"""Fusion and local reranking of results from several web search queries."""
+
+import os
+from typing import Sequence
+
+import numpy as np
+
+import embeddings
+from brave_search import _normalize_url
+
+# Number of query variants (primary included) searched for a single user
+# question. The Brave MCP server allows 1 request/s, so every extra variant
+# starts ~1s later - the default of 2 keeps the search ~1s over a single one.
+MAX_SEARCH_QUERIES = int(os.getenv("MAX_SEARCH_QUERIES", "2"))
+# Standard RRF damping constant (Cormack et al.) - lowers the weight of top ranks
+RRF_K = 60
+# Only the best fused candidates by RRF are reranked with embeddings
+RERANK_CANDIDATES = 15
+# Weight of the (max-normalised) RRF score in the final rerank score,
+# the rest goes to the embedding similarity with the user question
+RRF_WEIGHT = 0.4
+# Number of fused results passed on to the summariser
+RERANK_TOP_K = 5
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[dict[str, str]]], k: int = RRF_K
+) -> list[dict]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Results are deduplicated by normalised URL. A result's fused score is
+    `sum(1 / (k + rank))` over every list it appears in (rank starts at 1).
+
+    Parameters
+    ----------
+    result_lists : Sequence[Sequence[dict[str, str]]]
+        One ranked list per search query, items with `title`, `description`
+        and `url` keys.
+    k : int
+        RRF damping constant.
+
+    Returns
+    -------
+    list[dict]
+        Unique results ordered by descending `rrf_score`.
+    """
+    fused: dict[str, dict] = {}
+    for results in result_lists:
+        for rank, r in enumerate(results, start=1):
+            url = _normalize_url(str(r.get("url", "")))
+            if not url:
+                continue
+            item = fused.get(url)
+            if item is None:
+                item = fused[url] = {
+                    "title": str(r.get("title", "")),
+                    "description": str(r.get("description", "")),
+                    "url": url,
+                    "rrf_score": 0.0,
+                }
+            elif len(str(r.get("description", ""))) > len(item["description"]):
+                # keep the most informative snippet of the duplicates
+                item["description"] = str(r["description"])
+            item["rrf_score"] += 1.0 / (k + rank)
+    # sorted() is stable, so ties keep first-seen order
+    return sorted(fused.values(), key=lambda x: x["rrf_score"], reverse=True)
+
+
+def rerank(
+    query: str,
+    results: Sequence[dict],
+    top_k: int = RERANK_TOP_K,
+    candidates: int = RERANK_CANDIDATES,
+    rrf_weight: float = RRF_WEIGHT,
+) -> list[dict]:
+    """
+    Rerank the best fused results against `query` and keep the top-k.
+
+    The top `candidates` results by RRF and the query are embedded in a
+    single batch and scored with one matrix-vector product. The final score
+    blends the cosine similarity with the RRF score normalised by its
+    maximum, so agreement across search queries still counts.
+
+    Parameters
+    ----------
+    query : str
+        The original user question.
+    results : Sequence[dict]
+        Candidates as returned by `reciprocal_rank_fusion`, best first.
+    top_k : int
+        Number of results to keep.
+    candidates : int
+        Number of best RRF results considered for reranking.
+    rrf_weight : float
+        Weight of the normalised RRF score, 0.0 -> similarity only.
+
+    Returns
+    -------
+    list[dict]
+        Up to `top_k` results, each with added `similarity` and `score` keys.
+    """
+    pool = list(results[:candidates])
+    if not pool:
+        return []
+    docs = [f"{r['title']}. {r['description']}" for r in pool]
+    vectors = embeddings.embed([query, *docs])
+    similarities = vectors[1:] @ vectors[0]
+    rrf_scores = np.array([r.get("rrf_score", 0.0) for r in pool])
+    if rrf_scores.max() > 0:
+        rrf_scores = rrf_scores / rrf_scores.max()
+    scores = (1 - rrf_weight) * similarities + rrf_weight * rrf_scores
+    # stable sort keeps the RRF order for equal scores
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [
+        {**pool[i], "similarity": float(similarities[i]), "score": float(scores[i])}
+        for i in order
+    ]
+
+
+def results_to_text(results: Sequence[dict]) -> str:
+    """Format results in the Brave tool output layout for the summariser."""
+    return "\n\n".join(
+        f"Title: {r['title']}\nDescription: {r['description']}\nURL: {r['url']}"
+        for r in results
+    )